@@ -3,12 +3,32 @@ from __future__ import annotations
 
 import os
 import glob
+import numpy as np
 import pandas as pd
 
+try:
+    import duckdb
+except ImportError:  # DuckDB is optional; fall back to the pandas builders
+    duckdb = None
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; kernels then run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
 
 RAW_DIR = "data/raw"
 OUT_DIR = "data/processed"
 
+# Event columns used by the gold builders (quantity is never read)
+EVENT_COLUMNS = ["event_ts", "event_date", "customer_id", "market", "extra_id", "event_type"]
+# Low-cardinality event columns held as categoricals (int codes instead of strings)
+EVENT_CATEGORICALS = ["customer_id", "market", "extra_id", "event_type"]
+EVENT_DATES = ["event_ts", "event_date"]
+
 
 def detect_format() -> str:
     if os.path.exists(os.path.join(RAW_DIR, "fact_events.parquet")):
@@ -18,11 +38,33 @@ def detect_format() -> str:
     raise FileNotFoundError("No fact_events.parquet or fact_events.csv found in data/raw")
 
 
-def read_table(name: str, fmt: str) -> pd.DataFrame:
+def read_table(name: str, fmt: str, columns: list | None = None,
+               parse_dates: list | None = None) -> pd.DataFrame:
     path = os.path.join(RAW_DIR, f"{name}.{fmt}")
     if fmt == "parquet":
-        return pd.read_parquet(path)
-    return pd.read_csv(path)
+        df = pd.read_parquet(path, columns=columns)
+        # date32 columns load as Python dates; typed once here
+        for col in parse_dates or []:
+            df[col] = pd.to_datetime(df[col])
+        return df
+    # Only empty fields are missing (region "NA" is North America), as in DuckDB
+    return pd.read_csv(path, usecols=columns, parse_dates=parse_dates,
+                       keep_default_na=False, na_values=[""])
+
+
+def read_events(fmt: str) -> pd.DataFrame:
+    """
+    Read fact_events with only EVENT_COLUMNS: EVENT_DATES come back as
+    datetime64, keys are cast to category once so comparisons and groupbys
+    work on integer codes. Categories are sorted, so code order matches
+    string order (parquet written by generate_data keeps the dim order).
+    """
+    # Only the projected columns are decoded (parquet reads skip the rest)
+    events = read_table("fact_events", fmt, columns=EVENT_COLUMNS, parse_dates=EVENT_DATES)
+    for col in EVENT_CATEGORICALS:
+        cat = events[col].astype("category")
+        events[col] = cat.cat.reorder_categories(cat.cat.categories.sort_values())
+    return events
 
 
 def save_table(df: pd.DataFrame, name: str, fmt: str) -> str:
@@ -35,26 +77,56 @@ def save_table(df: pd.DataFrame, name: str, fmt: str) -> str:
     return path
 
 
-def dq_checks(events: pd.DataFrame, customers: pd.DataFrame, extras: pd.DataFrame) -> pd.DataFrame:
+def save_relation(rel: "duckdb.DuckDBPyRelation", name: str, fmt: str) -> str:
+    """
+    Write a DuckDB relation straight to OUT_DIR; the query runs while writing.
+    """
+    os.makedirs(OUT_DIR, exist_ok=True)
+    path = os.path.join(OUT_DIR, f"{name}.{fmt}")
+    if fmt == "parquet":
+        rel.write_parquet(path)
+    else:
+        # Gold timestamps are month starts; written date-only like pandas to_csv
+        rel.write_csv(path, timestamp_format="%Y-%m-%d")
+    return path
+
+
+def _dq_frame(results: list) -> pd.DataFrame:
+    """
+    Build gold_dq_results from (check_name, table_name, severity, failed_rows) tuples.
+    """
     today = pd.Timestamp.today().date()
+    return pd.DataFrame([{
+        "date": today,
+        "check_name": check_name,
+        "table_name": table_name,
+        "severity": severity,
+        "failed_rows": int(failed_rows),
+        "sample_keys": ""
+    } for check_name, table_name, severity, failed_rows in results])
+
+
+def dq_checks(events: pd.DataFrame, customers: pd.DataFrame, extras: pd.DataFrame) -> pd.DataFrame:
     rows = []
 
     def add(check_name: str, table_name: str, severity: str, failed_rows: int):
-        rows.append({
-            "date": today,
-            "check_name": check_name,
-            "table_name": table_name,
-            "severity": severity,
-            "failed_rows": int(failed_rows),
-            "sample_keys": ""
-        })
+        rows.append((check_name, table_name, severity, failed_rows))
 
     # 1) Missing keys
-    missing = events[["event_ts", "event_date", "customer_id", "market", "extra_id", "event_type"]].isna().any(axis=1).sum()
+    missing = events[EVENT_COLUMNS].isna().any(axis=1).sum()
     add("missing_keys", "events", "fail" if missing > 0 else "info", missing)
 
-    # 2) Duplicates (same timestamp + customer + extra + event_type)
-    dup_count = events.duplicated(subset=["event_ts", "customer_id", "extra_id", "event_type"]).sum()
+    # 2) Duplicates (same timestamp + customer + extra + event_type): the three
+    # categorical codes are packed into one int64, then one lexsort with the
+    # int64 timestamps and a count of rows equal to their predecessor
+    ts = events["event_ts"].to_numpy().view("int64")
+    key = np.zeros(len(events), dtype=np.int64)
+    for col in ["customer_id", "extra_id", "event_type"]:
+        codes = pd.factorize(events[col])[0] + 1  # missing (-1) -> 0
+        key = key * (codes.max(initial=0) + 1) + codes
+    order = np.lexsort((key, ts))
+    ts, key = ts[order], key[order]
+    dup_count = ((ts[1:] == ts[:-1]) & (key[1:] == key[:-1])).sum()
     add("duplicates", "events", "warn" if dup_count > 0 else "info", dup_count)
 
     # 3) Invalid sequence: renew before purchase (per customer-market-extra)
@@ -63,11 +135,11 @@ def dq_checks(events: pd.DataFrame, customers: pd.DataFrame, extras: pd.DataFram
         invalid_seq = 0
     else:
         first_purchase = (sub[sub["event_type"] == "purchase"]
-                         .groupby(["customer_id", "market", "extra_id"])["event_date"]
+                         .groupby(["customer_id", "market", "extra_id"], sort=False, observed=True)["event_date"]
                          .min()
                          .rename("first_purchase"))
         first_renew = (sub[sub["event_type"] == "renew"]
-                      .groupby(["customer_id", "market", "extra_id"])["event_date"]
+                      .groupby(["customer_id", "market", "extra_id"], sort=False, observed=True)["event_date"]
                       .min()
                       .rename("first_renew"))
         seq = pd.concat([first_purchase, first_renew], axis=1).reset_index()
@@ -75,39 +147,84 @@ def dq_checks(events: pd.DataFrame, customers: pd.DataFrame, extras: pd.DataFram
                        ((seq["first_purchase"].isna()) | (seq["first_renew"] < seq["first_purchase"]))).sum()
     add("invalid_sequence_renew_before_purchase", "events", "warn" if invalid_seq > 0 else "info", invalid_seq)
 
-    # 4) Market mismatch events vs customers
-    merged = events[["customer_id", "market"]].merge(customers[["customer_id", "market"]], on="customer_id", how="left", suffixes=("_event", "_cust"))
-    mismatch = (merged["market_cust"].notna() & (merged["market_event"] != merged["market_cust"])).sum()
+    # 4) Market mismatch events vs customers: look up the expected market code
+    # once per distinct customer and compare integer codes (no merged frame)
+    ev_market = events["market"].astype("category")
+    ev_cust = events["customer_id"].astype("category")
+    cust_market = (customers.drop_duplicates("customer_id")
+                   .set_index("customer_id")["market"]
+                   .reindex(ev_cust.cat.categories))
+    # -1: customer unknown / no market, -2: market never seen in events
+    expected = pd.Categorical(cust_market, categories=ev_market.cat.categories).codes.astype(np.int64)
+    expected[(expected == -1) & cust_market.notna().to_numpy()] = -2
+    cust_codes = ev_cust.cat.codes.to_numpy()
+    expected_row = np.where(cust_codes >= 0, expected[cust_codes], -1)
+    mismatch = ((expected_row != -1) & (expected_row != ev_market.cat.codes.to_numpy())).sum()
     add("market_mismatch_events_vs_customers", "events/customers", "warn" if mismatch > 0 else "info", mismatch)
 
     # 5) Non-positive price
     nonpos = (extras["price_monthly"] <= 0).sum()
     add("non_positive_price", "extras", "fail" if nonpos > 0 else "info", nonpos)
 
-    return pd.DataFrame(rows)
+    return _dq_frame(rows)
+
+
+@njit(cache=True)
+def _cumsum_by_group(grp, vals, out):
+    """
+    Running sum of vals that restarts whenever grp changes (rows sorted by group).
+    """
+    acc = 0
+    for i in range(vals.size):
+        if i == 0 or grp[i] != grp[i - 1]:
+            acc = 0
+        acc += vals[i]
+        out[i] = acc
+
+
+def _count_distinct(grp: np.ndarray, vals: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Number of distinct vals per group id (0..n_groups-1) from one lexsort:
+    a row counts when its (group, value) pair differs from the previous row.
+    Negative ids / values (missing, e.g. ngroup().fillna(-1) for rows whose
+    keys groupby dropped) are ignored, like nunique.
+    """
+    keep = (grp >= 0) & (vals >= 0)
+    grp, vals = grp[keep], vals[keep]
+    order = np.lexsort((vals, grp))
+    grp, vals = grp[order], vals[order]
+    new = np.ones(grp.size, dtype=bool)
+    new[1:] = (grp[1:] != grp[:-1]) | (vals[1:] != vals[:-1])
+    return np.bincount(grp[new], minlength=n_groups)
 
 
 def build_gold_daily_kpi(events: pd.DataFrame, markets: pd.DataFrame, extras: pd.DataFrame) -> pd.DataFrame:
-    # Ensure correct dtypes
-    ev = events.copy()
-    ev["event_date"] = pd.to_datetime(ev["event_date"]).dt.date
+    # Day keys as a datetime64[D] array; groupby takes it next to the key
+    # columns, so events itself is never copied
+    date_arr = events["event_date"].to_numpy().astype("datetime64[D]")
+
+    # Boolean indicators per event type so every aggregation is a plain groupby-sum
+    event_type = events["event_type"]
+    flags = pd.DataFrame({
+        "trials": event_type == "trial_start",
+        "purchases": event_type == "purchase",
+        "renewals": event_type == "renew",
+        "cancels": event_type == "cancel",
+        "sessions": event_type == "usage_session",
+    })
 
     # 1) Daily aggregated counts
-    def count_type(df: pd.DataFrame, t: str) -> pd.Series:
-        return (df["event_type"] == t).sum()
-
-    daily = (ev
-        .groupby(["event_date", "market", "extra_id"], as_index=False)
-        .agg(
-            trials=("event_type", lambda s: (s == "trial_start").sum()),
-            purchases=("event_type", lambda s: (s == "purchase").sum()),
-            renewals=("event_type", lambda s: (s == "renew").sum()),
-            cancels=("event_type", lambda s: (s == "cancel").sum()),
-            sessions=("event_type", lambda s: (s == "usage_session").sum()),
-            active_users=("customer_id", lambda s: s[ev.loc[s.index, "event_type"] == "usage_session"].nunique()),
-        )
+    grouped = flags.groupby([date_arr, events["market"], events["extra_id"]], sort=False, observed=True)
+    daily = grouped.sum().rename_axis(["date", "market", "extra_id"]).reset_index()
+    is_session = flags["sessions"].to_numpy()
+    daily["active_users"] = _count_distinct(
+        grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)[is_session],
+        pd.factorize(events["customer_id"])[0][is_session],
+        len(daily),
     )
-    daily = daily.rename(columns={"event_date": "date"})
+    # Groups come out in first-seen order; only the aggregate is sorted
+    daily = daily.sort_values(["market", "extra_id", "date"], ignore_index=True)
+    daily["date"] = daily["date"].dt.date
 
     # 2) Add region/category/price
     out = (daily
@@ -115,10 +232,13 @@ def build_gold_daily_kpi(events: pd.DataFrame, markets: pd.DataFrame, extras: pd
         .merge(extras[["extra_id", "category", "price_monthly"]], on="extra_id", how="left")
     )
 
-    # 3) Active subscriptions proxy (cumulative net adds)
-    out = out.sort_values(["market", "extra_id", "date"])
+    # 3) Active subscriptions proxy (cumulative net adds); left merges keep
+    # the (market, extra_id, date) order of daily
     out["net_adds"] = out["purchases"] + out["renewals"] - out["cancels"]
-    out["active_subscriptions"] = out.groupby(["market", "extra_id"])["net_adds"].cumsum()
+    grp = (pd.factorize(out["market"])[0].astype(np.int64) << 16) | pd.factorize(out["extra_id"])[0]
+    active = np.empty(len(out), dtype=np.int64)
+    _cumsum_by_group(grp, out["net_adds"].to_numpy(dtype=np.int64), active)
+    out["active_subscriptions"] = active
 
     # 4) MRR
     out["mrr"] = (out["active_subscriptions"] * out["price_monthly"]).round(2)
@@ -134,73 +254,246 @@ def build_gold_daily_kpi(events: pd.DataFrame, markets: pd.DataFrame, extras: pd
 
 
 def build_gold_cohort_retention(events: pd.DataFrame) -> pd.DataFrame:
-    ev = events.copy()
-    ev["event_date"] = pd.to_datetime(ev["event_date"])
-    ev["month"] = ev["event_date"].dt.to_period("M").dt.to_timestamp()
+    keys = ["customer_id", "market", "extra_id"]
+
+    # Month keys truncated in one vectorized cast (no Period objects); only
+    # the purchase / renew rows are materialized below, never a copy of events
+    month_arr = events["event_date"].to_numpy().astype("datetime64[M]")
+    event_type = events["event_type"]
+    is_purchase = (event_type == "purchase").to_numpy()
+    is_active = event_type.isin(["purchase", "renew"]).to_numpy()
 
     # 1) Find first purchase month (cohort)
-    purchases = ev[ev["event_type"] == "purchase"].copy()
-    first_purchase = (purchases
-        .groupby(["customer_id", "market", "extra_id"], as_index=False)["month"]
+    first_purchase = (events.loc[is_purchase, keys]
+        .assign(month=month_arr[is_purchase])
+        .groupby(keys, as_index=False, sort=False, observed=True)["month"]
         .min()
         .rename(columns={"month": "cohort_month"})
     )
 
     # 2) Monthly active definition (simplified): any purchase or renew in that month
-    monthly_active = ev[ev["event_type"].isin(["purchase", "renew"])][
-        ["customer_id", "market", "extra_id", "month"]
-    ].drop_duplicates()
+    monthly_active = (events.loc[is_active, keys]
+        .assign(month=month_arr[is_active])
+        .drop_duplicates()
+    )
 
     # 3) Join cohort with monthly activity
     j = first_purchase.merge(monthly_active, on=["customer_id", "market", "extra_id"], how="left")
 
-    # month_n = months since cohort_month
-    j["month_n"] = (j["month"].dt.to_period("M") - j["cohort_month"].dt.to_period("M")).apply(lambda x: x.n)
+    # month_n = months since cohort_month: datetime64[M] values are month counts,
+    # so this is a plain int64 difference (no-activity rows get -1 and drop out)
+    month = j["month"].to_numpy().astype("datetime64[M]")
+    cohort_month = j["cohort_month"].to_numpy().astype("datetime64[M]")
+    j["month_n"] = np.where(np.isnat(month), -1, month.astype("int64") - cohort_month.astype("int64"))
 
     j = j[j["month_n"] >= 0]
 
     # 4) cohort_size
     cohort_sizes = (first_purchase
-        .groupby(["cohort_month", "market", "extra_id"], as_index=False)
+        .groupby(["cohort_month", "market", "extra_id"], as_index=False, sort=False, observed=True)
         .size()
         .rename(columns={"size": "cohort_size"})
     )
 
     # 5) retained_subs per month_n
-    retained = (j
-        .groupby(["cohort_month", "market", "extra_id", "month_n"], as_index=False)["customer_id"]
-        .nunique()
-        .rename(columns={"customer_id": "retained_subs"})
+    grouped = j.groupby(["cohort_month", "market", "extra_id", "month_n"], as_index=False, sort=False, observed=True)
+    retained = grouped.size().drop(columns="size")
+    retained["retained_subs"] = _count_distinct(
+        grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64), pd.factorize(j["customer_id"])[0], len(retained)
     )
 
     out = retained.merge(cohort_sizes, on=["cohort_month", "market", "extra_id"], how="left")
     out["retention_rate"] = (out["retained_subs"] / out["cohort_size"]).round(4)
 
-    # Ordering
+    # Ordering; keys back to plain strings (categoricals would be written as dictionaries)
     out = out.sort_values(["cohort_month", "market", "extra_id", "month_n"]).reset_index(drop=True)
+    out = out.astype({"market": str, "extra_id": str})
     return out
 
 
+def connect_duckdb(fmt: str) -> "duckdb.DuckDBPyConnection":
+    """
+    Open an in-memory DuckDB connection with views over the raw files.
+
+    Views scan the files directly, so queries stream from disk instead of
+    going through pandas.
+    """
+    reader = "read_parquet" if fmt == "parquet" else "read_csv_auto"
+    con = duckdb.connect()
+    for view, name in [("markets", "dim_market"), ("extras", "dim_extra"),
+                       ("customers", "dim_customer"), ("events", "fact_events")]:
+        path = os.path.join(RAW_DIR, f"{name}.{fmt}")
+        con.execute(f"CREATE VIEW {view} AS SELECT * FROM {reader}('{path}')")
+    return con
+
+
+def dq_checks_duckdb(con: "duckdb.DuckDBPyConnection") -> pd.DataFrame:
+    # All counters in one statement: events (joined once with the customer
+    # market) feed the missing / duplicate / mismatch filters in a single
+    # aggregate and the per-key purchase/renew minima in the seq CTE.
+    missing, dup_count, invalid_seq, mismatch, nonpos = con.execute("""
+        WITH ev AS (
+            SELECT e.*, c.market AS customer_market
+            FROM events e
+            LEFT JOIN (
+                SELECT customer_id, any_value(market) AS market
+                FROM customers GROUP BY customer_id
+            ) c ON c.customer_id = e.customer_id
+        ),
+        seq AS (
+            SELECT
+                min(event_date) FILTER (WHERE event_type = 'purchase') AS first_purchase,
+                min(event_date) FILTER (WHERE event_type = 'renew')    AS first_renew
+            FROM ev
+            WHERE event_type IN ('purchase', 'renew')
+              -- NULL keys dropped, as in the pandas groupby
+              AND customer_id IS NOT NULL AND market IS NOT NULL AND extra_id IS NOT NULL
+            GROUP BY customer_id, market, extra_id
+        )
+        SELECT
+            -- 1) Missing keys
+            count(*) FILTER (WHERE event_ts IS NULL OR event_date IS NULL OR customer_id IS NULL
+                                OR market IS NULL OR extra_id IS NULL OR event_type IS NULL),
+            -- 2) Duplicates (same timestamp + customer + extra + event_type)
+            count(*) - count(DISTINCT (event_ts, customer_id, extra_id, event_type)),
+            -- 3) Invalid sequence: renew before purchase (per customer-market-extra)
+            (SELECT count(*) FROM seq
+             WHERE first_renew IS NOT NULL
+               AND (first_purchase IS NULL OR first_renew < first_purchase)),
+            -- 4) Market mismatch events vs customers
+            count(*) FILTER (WHERE customer_market IS NOT NULL AND market IS DISTINCT FROM customer_market),
+            -- 5) Non-positive price
+            (SELECT count(*) FROM extras WHERE price_monthly <= 0)
+        FROM ev
+    """).fetchone()
+
+    return _dq_frame([
+        ("missing_keys", "events", "fail" if missing > 0 else "info", missing),
+        ("duplicates", "events", "warn" if dup_count > 0 else "info", dup_count),
+        ("invalid_sequence_renew_before_purchase", "events", "warn" if invalid_seq > 0 else "info", invalid_seq),
+        ("market_mismatch_events_vs_customers", "events/customers", "warn" if mismatch > 0 else "info", mismatch),
+        ("non_positive_price", "extras", "fail" if nonpos > 0 else "info", nonpos),
+    ])
+
+
+def build_gold_daily_kpi_duckdb(con: "duckdb.DuckDBPyConnection") -> "duckdb.DuckDBPyRelation":
+    # Same logic as build_gold_daily_kpi, as one aggregation + one window pass.
+    # Returns a lazy relation; nothing runs until it is written.
+    return con.sql("""
+        WITH daily AS (
+            SELECT
+                event_date AS date,
+                market,
+                extra_id,
+                count(*) FILTER (WHERE event_type = 'trial_start')   AS trials,
+                count(*) FILTER (WHERE event_type = 'purchase')      AS purchases,
+                count(*) FILTER (WHERE event_type = 'renew')         AS renewals,
+                count(*) FILTER (WHERE event_type = 'cancel')        AS cancels,
+                count(*) FILTER (WHERE event_type = 'usage_session') AS sessions,
+                count(DISTINCT customer_id) FILTER (WHERE event_type = 'usage_session') AS active_users
+            FROM events
+            -- GROUP BY keeps NULL keys; the pandas groupby drops them
+            WHERE event_date IS NOT NULL AND market IS NOT NULL AND extra_id IS NOT NULL
+            GROUP BY 1, 2, 3
+        ),
+        kpi AS (
+            SELECT
+                d.*,
+                sum(d.purchases + d.renewals - d.cancels) OVER (
+                    PARTITION BY d.market, d.extra_id ORDER BY d.date
+                    ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                )::BIGINT AS active_subscriptions
+            FROM daily d
+        )
+        SELECT
+            k.date, k.market, m.region, k.extra_id, x.category,
+            k.trials, k.purchases, k.renewals, k.cancels,
+            k.active_subscriptions, k.active_users, k.sessions,
+            round(k.active_subscriptions * x.price_monthly, 2) AS mrr
+        FROM kpi k
+        LEFT JOIN markets m ON m.market = k.market
+        LEFT JOIN extras x ON x.extra_id = k.extra_id
+        ORDER BY k.market, k.extra_id, k.date
+    """)
+
+
+def build_gold_cohort_retention_duckdb(con: "duckdb.DuckDBPyConnection") -> "duckdb.DuckDBPyRelation":
+    # Same logic as build_gold_cohort_retention; month activity is computed once
+    # and reused for both the cohort (first purchase month) and retention.
+    # Returns a lazy relation; nothing runs until it is written.
+    return con.sql("""
+        WITH activity AS (
+            SELECT DISTINCT
+                customer_id, market, extra_id, event_type,
+                date_trunc('month', event_date) AS month
+            FROM events
+            WHERE event_type IN ('purchase', 'renew')
+        ),
+        cohorts AS (
+            SELECT
+                customer_id, market, extra_id,
+                min(month) FILTER (WHERE event_type = 'purchase') AS cohort_month
+            FROM activity
+            GROUP BY customer_id, market, extra_id
+            HAVING cohort_month IS NOT NULL
+        ),
+        cohort_sizes AS (
+            SELECT cohort_month, market, extra_id, count(*) AS cohort_size
+            FROM cohorts
+            GROUP BY cohort_month, market, extra_id
+        ),
+        retained AS (
+            SELECT
+                c.cohort_month, c.market, c.extra_id,
+                datediff('month', c.cohort_month, a.month) AS month_n,
+                count(DISTINCT c.customer_id) AS retained_subs
+            FROM cohorts c
+            JOIN activity a USING (customer_id, market, extra_id)
+            WHERE a.month >= c.cohort_month
+            GROUP BY 1, 2, 3, 4
+        )
+        SELECT
+            r.cohort_month, r.market, r.extra_id, r.month_n,
+            r.retained_subs, s.cohort_size,
+            round(r.retained_subs / s.cohort_size, 4) AS retention_rate
+        FROM retained r
+        JOIN cohort_sizes s USING (cohort_month, market, extra_id)
+        ORDER BY r.cohort_month, r.market, r.extra_id, r.month_n
+    """)
+
+
 def main() -> None:
     fmt = detect_format()
 
-    markets = read_table("dim_market", fmt)
-    extras = read_table("dim_extra", fmt)
-    customers = read_table("dim_customer", fmt)
-    events = read_table("fact_events", fmt)
+    if duckdb is not None:
+        con = connect_duckdb(fmt)
+
+        # DQ (small; pandas only for printing)
+        dq = dq_checks_duckdb(con)
+        print("DQ checks:\n", dq)
+
+        # Gold KPI tables, streamed from the raw files to the output files
+        p1 = save_table(dq, "gold_dq_results", fmt)
+        p2 = save_relation(build_gold_daily_kpi_duckdb(con), "gold_daily_kpi", fmt)
+        p3 = save_relation(build_gold_cohort_retention_duckdb(con), "gold_cohort_retention", fmt)
+    else:
+        markets = read_table("dim_market", fmt)
+        extras = read_table("dim_extra", fmt)
+        customers = read_table("dim_customer", fmt)
+        events = read_events(fmt)
 
-    # DQ
-    dq = dq_checks(events, customers, extras)
-    print("DQ checks:\n", dq)
+        # DQ
+        dq = dq_checks(events, customers, extras)
+        print("DQ checks:\n", dq)
 
-    # Gold KPI tables
-    daily = build_gold_daily_kpi(events, markets, extras)
-    cohorts = build_gold_cohort_retention(events)
+        # Gold KPI tables
+        daily = build_gold_daily_kpi(events, markets, extras)
+        cohorts = build_gold_cohort_retention(events)
 
-    # Save
-    p1 = save_table(dq, "gold_dq_results", fmt)
-    p2 = save_table(daily, "gold_daily_kpi", fmt)
-    p3 = save_table(cohorts, "gold_cohort_retention", fmt)
+        # Save
+        p1 = save_table(dq, "gold_dq_results", fmt)
+        p2 = save_table(daily, "gold_daily_kpi", fmt)
+        p3 = save_table(cohorts, "gold_cohort_retention", fmt)
 
     print("\nSaved:")
     print("-", p1)
@@ -209,4 +502,4 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -20,16 +20,44 @@ import argparse
 import os
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, Tuple, List
+from typing import Dict, List
 
 import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # parquet output then goes through df.to_parquet (e.g. fastparquet)
+    pa = pq = None
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; kernels then run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
 
 # -----------------------------
 # Config / helpers
 # -----------------------------
 
+EVENT_TYPES = ["trial_start", "purchase", "renew", "cancel", "usage_session"]
+TRIAL_START, PURCHASE, RENEW, CANCEL, USAGE_SESSION = range(len(EVENT_TYPES))
+
+SEGMENTS = ["Private", "Business", "Premium"]
+BUSINESS, PREMIUM = 1, 2
+
+# Parquet layout: zstd, row groups small enough for min/max pruning,
+# dictionary encoding only for the low-cardinality key columns
+PARQUET_ROW_GROUP_SIZE = 500_000
+DICTIONARY_COLUMNS = ["event_type", "market", "extra_id", "customer_id"]
+# Day columns kept as datetime64 in pandas but stored as parquet date32
+DATE_COLUMNS = ["event_date"]
+
+
 @dataclass
 class SaveResult:
     path: str
@@ -50,7 +78,25 @@ def _try_save(df: pd.DataFrame, out_dir: str, name: str, preferred_fmt: str) ->
     if preferred_fmt == "parquet":
         try:
             out_path = os.path.join(out_dir, f"{name}.parquet")
-            df.to_parquet(out_path, index=False)
+            if pq is None:
+                df.to_parquet(out_path, index=False)
+                return SaveResult(out_path, "parquet")
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            for col in DATE_COLUMNS:
+                if col in table.column_names:
+                    i = table.column_names.index(col)
+                    table = table.set_column(i, col, table[col].cast(pa.date32()))
+            pq.write_table(
+                table,
+                out_path,
+                compression="zstd",
+                compression_level=3,
+                row_group_size=PARQUET_ROW_GROUP_SIZE,
+                use_dictionary=[c for c in DICTIONARY_COLUMNS if c in df.columns],
+                data_page_size=1 << 20,
+                write_statistics=True,
+            )
             return SaveResult(out_path, "parquet")
         except Exception:
             # fall back
@@ -61,10 +107,6 @@ def _try_save(df: pd.DataFrame, out_dir: str, name: str, preferred_fmt: str) ->
     return SaveResult(out_path, "csv")
 
 
-def _date_range_days(start: pd.Timestamp, end: pd.Timestamp) -> pd.DatetimeIndex:
-    return pd.date_range(start=start, end=end, freq="D")
-
-
 def _rng(seed: int) -> np.random.Generator:
     return np.random.default_rng(seed)
 
@@ -122,9 +164,8 @@ def make_dim_customer(
 
     chosen_markets = rng.choice(markets, size=n_customers, p=weights)
 
-    segments = ["Private", "Business", "Premium"]
     seg_weights = np.array([0.70, 0.20, 0.10])
-    chosen_segments = rng.choice(segments, size=n_customers, p=seg_weights)
+    chosen_segments = rng.choice(SEGMENTS, size=n_customers, p=seg_weights)
 
     # Signup dates spread over the period (earlier bias)
     total_days = (end - start).days
@@ -141,7 +182,7 @@ def make_dim_customer(
     return df
 
 
-def _market_base_rates(dim_market: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+def _market_base_rates(rng: np.random.Generator, dim_market: pd.DataFrame) -> Dict[str, Dict[str, float]]:
     """
     Baseline rates by market:
     - trial_rate: probability that a customer starts at least one trial in the period
@@ -150,10 +191,9 @@ def _market_base_rates(dim_market: pd.DataFrame) -> Dict[str, Dict[str, float]]:
     - usage_uplift: multiplier for usage intensity
     """
     rates = {}
-    for _, row in dim_market.iterrows():
-        m = row["market"]
-        region = row["region"]
-
+    # Small market-specific variation, drawn for all markets at once
+    jitters = np.clip(rng.normal(1.0, 0.05, size=len(dim_market)), 0.85, 1.20)
+    for m, region, jitter in zip(dim_market["market"].to_numpy(), dim_market["region"].to_numpy(), jitters):
         # Heuristic region patterns (for meaningful insights)
         if region == "EU":
             trial_rate = 0.22
@@ -181,8 +221,6 @@ def _market_base_rates(dim_market: pd.DataFrame) -> Dict[str, Dict[str, float]]:
             churn_uplift = 1.10
             usage_uplift = 0.90
 
-        # Add small market-specific variation
-        jitter = np.clip(np.random.normal(1.0, 0.05), 0.85, 1.20)
         rates[m] = {
             "trial_rate": float(np.clip(trial_rate * jitter, 0.08, 0.40)),
             "conv_uplift": float(np.clip(conv_uplift * jitter, 0.70, 1.35)),
@@ -200,10 +238,10 @@ def _extra_base_rates(dim_extra: pd.DataFrame) -> Dict[str, Dict[str, float]]:
     - base_usage_lambda: expected daily usage sessions for active users
     """
     rates = {}
-    for _, r in dim_extra.iterrows():
-        ex = r["extra_id"]
-        cat = r["category"]
-        price = float(r["price_monthly"])
+    for ex, cat, price in zip(dim_extra["extra_id"].to_numpy(),
+                              dim_extra["category"].to_numpy(),
+                              dim_extra["price_monthly"].to_numpy(dtype=float)):
+        price = float(price)
 
         # Heuristics: higher price -> lower conversion, higher churn risk
         base_conv = 0.18 - 0.004 * (price - 5.0)  # rough
@@ -229,6 +267,45 @@ def _extra_base_rates(dim_extra: pd.DataFrame) -> Dict[str, Dict[str, float]]:
     return rates
 
 
+@njit(cache=True)
+def _resized(a, size, k):
+    out = np.empty(size, a.dtype)
+    out[:k] = a[:k]
+    return out
+
+
+@njit(cache=True)
+def _gen_sessions(seed, first_day, last_day, usage_lambda):
+    """
+    Usage-session kernel: for every window w, draw Poisson(usage_lambda[w])
+    sessions on each day in [first_day[w], last_day[w]].
+
+    Returns (window_idx, ts_min) arrays; ts_min is the session day in minutes
+    since the start date, the caller adds the minute of day in one batch.
+    """
+    np.random.seed(seed)
+    cap = 1024
+    for w in range(first_day.size):
+        cap += int(1.2 * usage_lambda[w] * (last_day[w] - first_day[w] + 1))
+    owner = np.empty(cap, np.int64)
+    ts_min = np.empty(cap, np.int64)
+    k = 0
+
+    for w in range(first_day.size):
+        for day in range(first_day[w], last_day[w] + 1):
+            n_sessions = np.random.poisson(usage_lambda[w])
+            if k + n_sessions > owner.size:
+                size = max(2 * owner.size, k + n_sessions)
+                owner = _resized(owner, size, k)
+                ts_min = _resized(ts_min, size, k)
+            for _ in range(n_sessions):
+                owner[k] = w
+                ts_min[k] = day * 1440
+                k += 1
+
+    return owner[:k], ts_min[:k]
+
+
 def generate_events(
     rng: np.random.Generator,
     dim_market: pd.DataFrame,
@@ -246,167 +323,160 @@ def generate_events(
     trial_start -> purchase -> renew (monthly) and/or cancel.
     usage_session events while trial/active.
 
+    Lifecycle decisions are drawn in batch for all (customer, extra) trial pairs;
+    only the day-by-day usage sessions run in the _gen_sessions kernel. Days are
+    offsets from start, timestamps are minutes since start.
+
     quality_noise: fraction of events to corrupt slightly (duplicates / invalid sequences) for DQ demo.
     """
-    m_rates = _market_base_rates(dim_market)
+    m_rates = _market_base_rates(rng, dim_market)
     e_rates = _extra_base_rates(dim_extra)
 
-    customers = dim_customer.copy()
-    extras = dim_extra["extra_id"].tolist()
-    all_days = _date_range_days(start, end)
-
-    events_rows: List[Tuple] = []
-
-    # Precompute per-customer: whether they start trials
-    # Some customers will trial multiple extras.
-    for _, c in customers.iterrows():
-        cust = c["customer_id"]
-        market = c["market"]
-        signup = pd.Timestamp(c["signup_date"])
-        if signup > end:
-            continue
-
-        trial_rate = m_rates[market]["trial_rate"]
-
-        # Number of extras trialed depends on trial_rate
-        if rng.random() > trial_rate:
-            continue
-
-        n_trials = int(np.clip(rng.poisson(1.2), 1, 4))
-        trial_extras = rng.choice(extras, size=n_trials, replace=False)
-
-        # Trial start dates after signup
-        for ex in trial_extras:
-            # pick trial start day
-            min_day = max(signup, start)
-            trial_start_day = min_day + pd.Timedelta(days=int(rng.integers(0, max(1, (end - min_day).days + 1))))
-            # timestamp during day
-            ts = trial_start_day + pd.Timedelta(minutes=int(rng.integers(0, 1440)))
-            events_rows.append((ts, ts.date(), cust, market, ex, "trial_start", 1))
-
-            # Determine conversion to purchase
-            base_conv = e_rates[ex]["base_conv"]
-            conv = base_conv * m_rates[market]["conv_uplift"]
-
-            # Campaign uplift after campaign_date in selected markets
-            if (market in campaign_markets) and (trial_start_day >= campaign_date):
-                conv *= campaign_conv_multiplier
-
-            # Segment effect: Premium converts better, Business slightly better
-            seg = c["segment"]
-            if seg == "Premium":
-                conv *= 1.20
-            elif seg == "Business":
-                conv *= 1.08
-
-            conv = float(np.clip(conv, 0.02, 0.60))
-
-            purchased = rng.random() < conv
-            if not purchased:
-                # usage during trial window (short)
-                # simulate 3-14 days of trial usage
-                trial_days = int(rng.integers(3, 15))
-                usage_lambda = e_rates[ex]["base_usage_lambda"] * m_rates[market]["usage_uplift"]
-                for d in range(trial_days):
-                    day = trial_start_day + pd.Timedelta(days=d)
-                    if day > end:
-                        break
-                    # sessions per day (0..)
-                    n_sessions = rng.poisson(usage_lambda)
-                    for _ in range(n_sessions):
-                        uts = day + pd.Timedelta(minutes=int(rng.integers(0, 1440)))
-                        events_rows.append((uts, uts.date(), cust, market, ex, "usage_session", 1))
-                continue
-
-            # Purchase event: within 0-21 days from trial
-            purchase_day = trial_start_day + pd.Timedelta(days=int(rng.integers(0, 22)))
-            if purchase_day > end:
-                continue
-            pts = purchase_day + pd.Timedelta(minutes=int(rng.integers(0, 1440)))
-            events_rows.append((pts, pts.date(), cust, market, ex, "purchase", 1))
-
-            # After purchase, generate renew/cancel monthly, plus usage
-            active_start = purchase_day
-            active_end = end
-
-            monthly_churn = e_rates[ex]["base_churn"] * m_rates[market]["churn_uplift"]
-            # Segment effect: Premium churns less
-            if seg == "Premium":
-                monthly_churn *= 0.80
-            elif seg == "Business":
-                monthly_churn *= 0.90
-            monthly_churn = float(np.clip(monthly_churn, 0.01, 0.25))
-
-            # Determine how many months subscription survives
-            # Geometric with churn prob
-            months_alive = 1
-            while months_alive < 12 and rng.random() > monthly_churn:
-                months_alive += 1
-
-            # Trial-like early churn: some cancel in first month
-            # months_alive already covers that; we also allow cancel day inside month.
-            cancel_happens = True  # in this demo, most eventually cancel within horizon
-            cancel_month = months_alive
-
-            # Compute cancel date (approx month = 30 days)
-            cancel_day = active_start + pd.Timedelta(days=30 * cancel_month) + pd.Timedelta(days=int(rng.integers(-5, 6)))
-            if cancel_day > end:
-                cancel_happens = False
-                active_end = end
-            else:
-                active_end = cancel_day
-
-            # Renew events each month boundary (1..months_alive-1) if within horizon
-            for m in range(1, months_alive):
-                renew_day = active_start + pd.Timedelta(days=30 * m)
-                if renew_day > end:
-                    break
-                rts = renew_day + pd.Timedelta(minutes=int(rng.integers(0, 1440)))
-                events_rows.append((rts, rts.date(), cust, market, ex, "renew", 1))
-
-            # Cancel event
-            if cancel_happens:
-                cts = active_end + pd.Timedelta(minutes=int(rng.integers(0, 1440)))
-                events_rows.append((cts, cts.date(), cust, market, ex, "cancel", 1))
-
-            # Usage while active (daily)
-            usage_lambda = e_rates[ex]["base_usage_lambda"] * m_rates[market]["usage_uplift"]
-            day = active_start
-            while day <= active_end and day <= end:
-                n_sessions = rng.poisson(usage_lambda)
-                for _ in range(n_sessions):
-                    uts = day + pd.Timedelta(minutes=int(rng.integers(0, 1440)))
-                    events_rows.append((uts, uts.date(), cust, market, ex, "usage_session", 1))
-                day += pd.Timedelta(days=1)
-
-    events = pd.DataFrame(
-        events_rows,
-        columns=["event_ts", "event_date", "customer_id", "market", "extra_id", "event_type", "quantity"]
+    markets = dim_market["market"].to_numpy()
+    extras = dim_extra["extra_id"].to_numpy()
+    market_rates = np.array([
+        [m_rates[m]["trial_rate"], m_rates[m]["conv_uplift"], m_rates[m]["churn_uplift"], m_rates[m]["usage_uplift"]]
+        for m in markets
+    ], dtype=np.float64)
+    extra_rates = np.array([
+        [e_rates[ex]["base_conv"], e_rates[ex]["base_churn"], e_rates[ex]["base_usage_lambda"]]
+        for ex in extras
+    ], dtype=np.float64)
+    n_extras = len(extras)
+    n_days = (end - start).days
+
+    # Per-customer state as integer arrays (indices into dim_market / SEGMENTS, day offsets)
+    cust_market = pd.Categorical(dim_customer["market"], categories=markets).codes.astype(np.int64)
+    cust_seg = pd.Categorical(dim_customer["segment"], categories=SEGMENTS).codes.astype(np.int64)
+    signup_day = (pd.to_datetime(dim_customer["signup_date"]) - start).dt.days.to_numpy(dtype=np.int64)
+
+    # A) Who trials, and which extras (1-4 distinct extras per trialing customer)
+    trialing = (signup_day <= n_days) & (rng.random(len(cust_market)) <= market_rates[cust_market, 0])
+    trial_cust = np.flatnonzero(trialing)
+    n_trials = np.clip(rng.poisson(1.2, size=trial_cust.size), 1, min(4, n_extras))
+    extra_order = np.argsort(rng.random((trial_cust.size, n_extras)), axis=1)
+
+    # Pair attributes in the narrowest int type for their dimension (categorical codes)
+    pair_cust = np.repeat(trial_cust, n_trials).astype(np.min_scalar_type(-len(cust_market)))
+    pair_extra = extra_order[np.arange(n_extras) < n_trials[:, None]].astype(np.min_scalar_type(-n_extras))
+    pair_market = cust_market[pair_cust].astype(np.min_scalar_type(-len(markets)))
+    pair_seg = cust_seg[pair_cust]
+    n_pairs = pair_cust.size
+
+    min_day = np.maximum(signup_day[pair_cust], 0)
+    trial_day = min_day + rng.integers(0, np.maximum(1, n_days - min_day + 1))
+    trial_ts = trial_day * 1440 + rng.integers(0, 1440, size=n_pairs)
+
+    # B) Conversion to purchase
+    conv = extra_rates[pair_extra, 0] * market_rates[pair_market, 1]
+    # Campaign uplift after campaign_date in selected markets
+    in_campaign = np.isin(markets, campaign_markets)[pair_market] & (trial_day >= (campaign_date - start).days)
+    conv = np.where(in_campaign, conv * campaign_conv_multiplier, conv)
+    # Segment effect: Premium converts better, Business slightly better
+    conv *= np.where(pair_seg == PREMIUM, 1.20, np.where(pair_seg == BUSINESS, 1.08, 1.0))
+    conv = np.clip(conv, 0.02, 0.60)
+
+    purchased = rng.random(n_pairs) < conv
+    usage_lambda = extra_rates[pair_extra, 2] * market_rates[pair_market, 3]
+
+    # C) Non-purchasers: usage during a 3-14 day trial window
+    trial_only = np.flatnonzero(~purchased)
+    trial_last = np.minimum(trial_day[trial_only] + rng.integers(3, 15, size=trial_only.size) - 1, n_days)
+
+    # D) Purchasers: purchase within 0-21 days from trial, then monthly renew / cancel
+    buy = np.flatnonzero(purchased)
+    purchase_day = trial_day[buy] + rng.integers(0, 22, size=buy.size)
+    in_horizon = purchase_day <= n_days
+    buy, purchase_day = buy[in_horizon], purchase_day[in_horizon]
+    purchase_ts = purchase_day * 1440 + rng.integers(0, 1440, size=buy.size)
+
+    monthly_churn = extra_rates[pair_extra[buy], 1] * market_rates[pair_market[buy], 2]
+    # Segment effect: Premium churns less
+    monthly_churn *= np.where(pair_seg[buy] == PREMIUM, 0.80, np.where(pair_seg[buy] == BUSINESS, 0.90, 1.0))
+    monthly_churn = np.clip(monthly_churn, 0.01, 0.25)
+
+    # Geometric number of months the subscription survives (capped at 12)
+    months_alive = np.minimum(rng.geometric(monthly_churn), 12)
+
+    # Cancel date (approx month = 30 days); beyond the horizon -> still active
+    cancel_day = purchase_day + 30 * months_alive + rng.integers(-5, 6, size=buy.size)
+    cancelled = cancel_day <= n_days
+    active_end = np.where(cancelled, cancel_day, n_days)
+    cancel_ts = cancel_day[cancelled] * 1440 + rng.integers(0, 1440, size=int(cancelled.sum()))
+
+    # Renew events each month boundary (1..months_alive-1) if within horizon
+    month = np.arange(1, 12)
+    renew_days = purchase_day[:, None] + 30 * month
+    renew_row, renew_col = np.nonzero((month < months_alive[:, None]) & (renew_days <= n_days))
+    renew_ts = renew_days[renew_row, renew_col] * 1440 + rng.integers(0, 1440, size=renew_row.size)
+
+    # Usage sessions for trial windows and active subscriptions
+    window_pair = np.concatenate([trial_only, buy])
+    session_window, session_ts = _gen_sessions(
+        int(rng.integers(0, 2**31 - 1)),
+        np.concatenate([trial_day[trial_only], purchase_day]),
+        np.concatenate([trial_last, active_end]),
+        usage_lambda[window_pair],
     )
-
-    # Sort for readability
-    events = events.sort_values(["event_ts", "customer_id", "extra_id"]).reset_index(drop=True)
-
-    # Inject small data-quality noise for later DQ monitoring demo
-    if quality_noise > 0 and len(events) > 0:
-        n_noise = int(len(events) * quality_noise)
-
-        # 50% duplicates: duplicate some random rows
-        n_dup = n_noise // 2
-        if n_dup > 0:
-            dup_idx = rng.choice(events.index.to_numpy(), size=n_dup, replace=False)
-            events = pd.concat([events, events.loc[dup_idx]], ignore_index=True)
-
-        # 50% invalid sequences: create a few "renew" events before purchase (rare)
-        n_inv = n_noise - n_dup
-        if n_inv > 0:
-            sample = events.sample(n=n_inv, random_state=42).copy()
-            sample["event_type"] = "renew"
-            sample["event_ts"] = sample["event_ts"] - pd.to_timedelta(rng.integers(1, 10, size=n_inv), unit="D")
-            sample["event_date"] = sample["event_ts"].dt.date
-            events = pd.concat([events, sample], ignore_index=True)
-
-        events = events.sort_values(["event_ts", "customer_id", "extra_id"]).reset_index(drop=True)
+    session_ts += rng.integers(0, 1440, size=session_ts.size)
+
+    parts = [
+        (trial_ts, np.arange(n_pairs), TRIAL_START),
+        (purchase_ts, buy, PURCHASE),
+        (renew_ts, buy[renew_row], RENEW),
+        (cancel_ts, buy[cancelled], CANCEL),
+        (session_ts, window_pair[session_window], USAGE_SESSION),
+    ]
+    n_events = sum(part_ts.size for part_ts, _, _ in parts)
+
+    # Data-quality noise for the DQ monitoring demo: 50% duplicates, 50% invalid sequences
+    n_noise = int(n_events * quality_noise) if quality_noise > 0 else 0
+    n_dup = n_noise // 2
+    n_inv = n_noise - n_dup
+
+    # One exact-size SoA block (events + noise rows); each stage writes its slice
+    ts_min = np.empty(n_events + n_noise, dtype=np.int64)
+    pair = np.empty(n_events + n_noise, dtype=np.int32)
+    type_code = np.empty(n_events + n_noise, dtype=np.int8)
+    k = 0
+    for part_ts, part_pair, code in parts:
+        ts_min[k:k + part_ts.size] = part_ts
+        pair[k:k + part_ts.size] = part_pair
+        type_code[k:k + part_ts.size] = code
+        k += part_ts.size
+
+    # Duplicates: copy some random rows
+    if n_dup > 0:
+        src = rng.choice(k, size=n_dup, replace=False)
+        ts_min[k:k + n_dup], pair[k:k + n_dup], type_code[k:k + n_dup] = ts_min[src], pair[src], type_code[src]
+        k += n_dup
+
+    # Invalid sequences: a few "renew" events moved 1-9 days earlier (rare)
+    if n_inv > 0:
+        src = rng.choice(k, size=n_inv, replace=False)
+        ts_min[k:] = ts_min[src] - rng.integers(1, 10, size=n_inv) * 1440
+        pair[k:] = pair[src]
+        type_code[k:] = RENEW
+
+    # Sort for readability (customer_id / extra_id order follows their dim order)
+    cust_idx, extra_idx = pair_cust[pair], pair_extra[pair]
+    order = np.lexsort((extra_idx, cust_idx, ts_min))
+    ts_min, pair, type_code = ts_min[order], pair[order], type_code[order]
+    cust_idx, market_idx, extra_idx = pair_cust[pair], pair_market[pair], pair_extra[pair]
+
+    # Timestamps are rebuilt from int64 minutes in one vectorized call
+    start_min = start.value // 60_000_000_000
+    event_ts = pd.Series(pd.to_datetime(start_min + ts_min, unit="m"))
+    events = pd.DataFrame({
+        "event_ts": event_ts,
+        "event_date": event_ts.to_numpy().astype("datetime64[D]"),
+        # Key columns as categoricals: parquet stores them dictionary-encoded
+        "customer_id": pd.Categorical.from_codes(cust_idx, categories=dim_customer["customer_id"]),
+        "market": pd.Categorical.from_codes(market_idx, categories=markets),
+        "extra_id": pd.Categorical.from_codes(extra_idx, categories=extras),
+        "event_type": pd.Categorical.from_codes(type_code, categories=EVENT_TYPES),
+        "quantity": 1,
+    })
 
     return events
 